@@ -0,0 +1,19 @@
+import multiprocessing
+import os
+
+# ✅ Pre-fork multi-worker mode: the app is imported once in the master, which runs the
+# warm-up and publishes the encrypted store to shared memory before any worker is forked.
+# Gunicorn binds only after that import returns, so server_1 answers /health and /ready
+# from a temporary probe listener on the same port while the master warms up.
+os.environ.setdefault("SERVER_1_PREFORK", "1")
+
+bind = f"0.0.0.0:{os.getenv('SERVER_1_PORT', 5001)}"
+workers = int(os.getenv("SERVER_1_WORKERS", multiprocessing.cpu_count()))
+preload_app = True
+timeout = int(os.getenv("SERVER_1_TIMEOUT", 120))
+
+def on_exit(server):
+    """Unlink the shared memory block once the master shuts down (workers only detach)."""
+    import server_1
+    if server_1.shared_store is not None:
+        server_1.shared_store.close(unlink=True)
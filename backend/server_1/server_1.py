@@ -5,56 +5,140 @@ from phe.util import invert
 import numpy as np
 from flask import Flask, request, jsonify
 import requests
-import redis
 import platform
 import logging
-import socket
 
 # Add backend to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-# ✅ Detect Local or Cloud Environment
-try:
-    socket.gethostbyname("securestorage-redis.redis.cache.windows.net")
-    IS_CLOUD = True
-except socket.gaierror:
-    IS_CLOUD = False
-    
-# ✅ Configure Redis Connection
-redis_client = redis.Redis(
-    host="localhost" if not IS_CLOUD else "securestorage-redis.redis.cache.windows.net",
-    port=6379 if not IS_CLOUD else 6380,
-    decode_responses=True,
-    password=os.getenv("REDIS_PASSWORD") if IS_CLOUD else None,
-    ssl=IS_CLOUD
-)
-
 # ✅ Import Required Modules
-from shared.paillier import encrypt_data, decrypt_data, homomorphic_addition, homomorphic_multiplication, public_key, EncryptedNumber, private_key
-from shared.token_manager import TokenManager
+from shared.paillier import homomorphic_addition, homomorphic_multiplication, EncryptedNumber, get_keypair, KEY_SIZE
+from shared.paillier import encrypt_packed, decrypt_packed, packed_addition, PACKING_FACTOR
+from shared.paillier import encrypt_coordinates, encrypted_squared_distance
+from shared.token_manager import TokenManager, wait_for_redis
 from shared.BloomFilter import MultiLevelBloomFilter
+from shared.spatial_grid import build_grid, grid_candidates
+from shared.lifecycle import WarmUp, register_probes, probe_listener, PROBE_ENDPOINTS
+from shared.shared_store import SharedArrayStore, CiphertextArray, CSRIndex, ciphertexts_to_array, groups_to_csr
+from shared.shared_store import dataframe_to_arrays, arrays_to_dataframe
 
 app = Flask(__name__)
 
+# ✅ Background Warm-up: bind the port first, build keys / dataset / indexes behind /ready
+warmup = WarmUp("server_1")
+register_probes(app, warmup)
+
 # ✅ Dataset Path Handling
 if platform.system() == "Windows":
     dataset_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../dataset/reduced_healthcare_dataset.csv"))
 else:
     dataset_path = "/app/dataset/reduced_healthcare_dataset.csv"
 
-if not os.path.exists(dataset_path):
-    raise FileNotFoundError(f"Dataset not found at path: {dataset_path}")
-
-# ✅ Load Dataset
-data_store = pd.read_csv(dataset_path)
-data_store["billing_amount_encrypted"] = encrypt_data(data_store["billing_amount"].fillna(0).tolist())
-
-# ✅ Initialize Token Manager & Bloom Filter
+# ✅ Coarse Public Grid: cell -> row ids, used to prefilter KNN candidates
+GRID_CELL_DEGREES = 10
+
+# ✅ Query Planner Settings
+ENCRYPTED_FIELDS = {"billing_amount"}  # Only ever filtered through Paillier ciphertexts, never projected
+BLOOM_FIELDS = {"name"}  # Fields added to the Bloom filter, so a negative lookup proves no match
+DEFAULT_PROJECTION = ["name", "medical_condition", "insurance_provider", "gender"]
+ENCRYPTED_RANGE_SELECTIVITY = 1 / 3  # No plaintext statistics exist for encrypted columns
+
+# ✅ Pre-fork Mode: warm up once in the parent, move state into shared memory, then fork workers (see gunicorn.conf.py)
+PREFORK = os.getenv("SERVER_1_PREFORK") == "1"
+SERVER_1_PORT = int(os.getenv("SERVER_1_PORT", 5001))  # Default to 5001 if not set
+CIPHERTEXT_BYTES = 2 * KEY_SIZE // 8  # Ciphertexts live in Z*_{n^2}
+
+# ✅ State populated by the warm-up phases below
+data_store = None
+billing_amount_packed = None  # PACKING_FACTOR rows share one ciphertext (row i lives in slot i % PACKING_FACTOR)
+encrypted_points = {}  # row id -> (E(x), E(y), E(x^2 + y^2))
+grid_index = {}
+column_cardinality = {}  # field -> distinct values, for exact-match selectivity
+column_ranges = {}  # numeric field -> (min, max), for plaintext range selectivity
 token_manager = TokenManager()
 bloom_filter = MultiLevelBloomFilter()
-
-for _, row in data_store.iterrows():
-    bloom_filter.add("name", row["name"])
+shared_store = None
+
+@warmup.phase("keygen")
+def generate_keys():
+    get_keypair()
+
+@warmup.phase("load_dataset")
+def load_dataset():
+    global data_store
+    if not os.path.exists(dataset_path):
+        raise FileNotFoundError(f"Dataset not found at path: {dataset_path}")
+    data_store = pd.read_csv(dataset_path)
+
+@warmup.phase("encrypt_billing")
+def encrypt_billing():
+    global billing_amount_packed
+    billing_amount_packed = encrypt_packed(data_store["billing_amount"].fillna(0).tolist())
+
+@warmup.phase("encrypt_coordinates")
+def encrypt_points():
+    points = data_store.dropna(subset=["latitude", "longitude"])
+    for done, (row_id, row) in enumerate(points.iterrows(), start=1):
+        encrypted_points[row_id] = encrypt_coordinates(row["latitude"], row["longitude"])
+        warmup.report_progress(done, len(points))
+
+@warmup.phase("build_grid")
+def build_grid_index():
+    global grid_index
+    points = data_store.loc[list(encrypted_points), ["latitude", "longitude"]]
+    grid_index = build_grid(dict(zip(points.index, points.itertuples(index=False))), GRID_CELL_DEGREES)
+
+@warmup.phase("build_bloom_filter")
+def build_bloom_filter():
+    for done, name in enumerate(data_store["name"], start=1):
+        bloom_filter.add("name", name)
+        warmup.report_progress(done, len(data_store))
+
+@warmup.phase("collect_statistics")
+def collect_statistics():
+    for field in data_store.columns:
+        if field in ENCRYPTED_FIELDS:
+            continue
+        if pd.api.types.is_numeric_dtype(data_store[field]):
+            column_ranges[field] = (float(data_store[field].min()), float(data_store[field].max()))
+        column_cardinality[field] = int(data_store[field].nunique())
+
+@warmup.phase("connect_redis")
+def connect_redis():
+    # Keep retrying: /ready stays 503 (with the round count as progress) until Redis answers
+    wait_for_redis(on_retry=lambda rounds: warmup.report_progress(rounds, None))
+
+def publish_shared_state():
+    """Move the dataset, ciphertexts, Bloom bit arrays and grid index into one shared memory block.
+
+    Workers forked afterwards read the same pages; the per-row EncryptedNumber objects, dicts and
+    object-dtype columns are dropped so copy-on-write refcount updates cannot duplicate them per worker.
+    Text columns become categoricals over shared codes, so only their distinct values stay Python objects.
+    """
+    global shared_store, data_store, billing_amount_packed, encrypted_points, grid_index
+    public_key, _ = get_keypair()
+
+    points = np.zeros((len(data_store), 3, CIPHERTEXT_BYTES), dtype=np.uint8)  # Indexed directly by row id
+    for row_id, encrypted_point in encrypted_points.items():
+        points[row_id] = ciphertexts_to_array(encrypted_point, CIPHERTEXT_BYTES)
+    grid_keys, grid_offsets, grid_row_ids = groups_to_csr(grid_index)
+    dataset_arrays, dataset_categories = dataframe_to_arrays(data_store)
+
+    shared_store = SharedArrayStore({
+        **dataset_arrays,
+        "billing_amount_packed": ciphertexts_to_array(billing_amount_packed, CIPHERTEXT_BYTES),
+        "encrypted_points": points,
+        "grid_offsets": grid_offsets,
+        "grid_row_ids": grid_row_ids,
+        "bloom_bits": np.stack([level.bit_array for level in bloom_filter.filters])
+    })
+
+    data_store = arrays_to_dataframe(shared_store, data_store.columns, dataset_categories)
+    billing_amount_packed = CiphertextArray(public_key, shared_store["billing_amount_packed"])
+    encrypted_points = CiphertextArray(public_key, shared_store["encrypted_points"])
+    grid_index = CSRIndex(grid_keys, shared_store["grid_offsets"], shared_store["grid_row_ids"])
+    for level, bit_array in zip(bloom_filter.filters, shared_store["bloom_bits"]):
+        level.bit_array = bit_array
 
 # ✅ Server 2 URL for Decryption
 SERVER_2_URL = os.getenv("SERVER_2_URL")
@@ -62,7 +146,7 @@ SERVER_2_URL = os.getenv("SERVER_2_URL")
 @app.before_request
 def require_authorization():
     """Require valid tokens for all queries except token generation."""
-    if request.endpoint not in ['generate_token', 'generate_query_token']:
+    if request.endpoint not in ['generate_token', 'generate_query_token', *PROBE_ENDPOINTS]:
         token = request.headers.get("Authorization")
         if not token or not token_manager.validate_access_token(token):
             return jsonify({"error": "Unauthorized access"}), 401
@@ -121,8 +205,7 @@ def range_query():
     if not bloom_filter.lookup(field, str(min_val)) and not bloom_filter.lookup(field, str(max_val)):
         return jsonify({"error": "No values found in Bloom Filter for the given range"}), 404
 
-    encrypted_values = data_store["billing_amount_encrypted"].tolist()
-    decrypted_values = np.array([decrypt_data(enc) for enc in encrypted_values])
+    decrypted_values = np.array(decrypt_packed(billing_amount_packed, len(data_store)))
 
     mask = (decrypted_values >= min_val) & (decrypted_values <= max_val)
     results = data_store[mask]
@@ -132,6 +215,10 @@ def range_query():
 
     return jsonify({"results": results.to_dict(orient="records")}), 200
 
+def is_number(value):
+    """JSON numbers only (bools are ints in Python but not valid bounds or coordinates)."""
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
 # ✅ KNN Query API
 @app.route('/knn_query', methods=['POST'])
 def knn_query():
@@ -144,14 +231,241 @@ def knn_query():
     request_data = request.get_json()
     latitude, longitude, k = request_data.get('latitude'), request_data.get('longitude'), request_data.get('k', 5)
 
-    data_store["distance"] = ((data_store["latitude"] - latitude) ** 2 + (data_store["longitude"] - longitude) ** 2) ** 0.5
-    results = data_store.nsmallest(k, "distance")
+    if request_data.get('encrypted'):
+        return encrypted_knn(latitude, longitude, k)
+
+    # Kept as a local Series: writing a column into data_store would dirty shared pages in every worker
+    distance = ((data_store["latitude"] - latitude) ** 2 + (data_store["longitude"] - longitude) ** 2) ** 0.5
+    results = data_store.loc[distance.nsmallest(k).index]
     
     selected_fields = ["name", "medical_condition", "insurance_provider", "gender"]
     results = results[selected_fields].drop_duplicates().dropna()
     
     return jsonify({"results": results.to_dict(orient="records")}), 200
 
+def encrypted_knn_row_ids(candidate_ids, latitude, longitude, k):
+    """Compute E(distance^2) for the candidates and let Server 2 return the top-k row ids."""
+    # No re-randomizing obfuscation: server_2 holds the private key and decrypts these anyway
+    encrypted_distances = [
+        str(encrypted_squared_distance(encrypted_points[row_id], latitude, longitude).ciphertext(be_secure=False))
+        for row_id in candidate_ids
+    ]
+
+    response = requests.post(f"{SERVER_2_URL}/knn_topk", json={
+        "encrypted_distances": encrypted_distances,
+        "row_ids": [int(row_id) for row_id in candidate_ids],
+        "k": k
+    })
+    response.raise_for_status()
+    return response.json()["row_ids"]
+
+def encrypted_knn(latitude, longitude, k):
+    """KNN over encrypted coordinates: Server 1 computes E(distance^2), Server 2 picks the top-k."""
+    if not is_number(latitude) or not is_number(longitude):
+        return jsonify({"error": "Numeric latitude and longitude are required"}), 400
+    if not isinstance(k, int) or isinstance(k, bool) or k < 1:
+        return jsonify({"error": "'k' must be a positive integer"}), 400
+
+    candidate_ids = grid_candidates(grid_index, latitude, longitude, k, GRID_CELL_DEGREES)
+    if not candidate_ids:
+        return jsonify({"results": []}), 200
+
+    try:
+        row_ids = encrypted_knn_row_ids(candidate_ids, latitude, longitude, k)
+    except requests.HTTPError as e:
+        return jsonify(e.response.json()), e.response.status_code
+    except Exception as e:
+        return jsonify({"error": f"Failed to reach Server 2: {str(e)}"}), 502
+
+    results = data_store.loc[row_ids]
+
+    selected_fields = ["name", "medical_condition", "insurance_provider", "gender"]
+    results = results[selected_fields].drop_duplicates().dropna()
+
+    return jsonify({"results": results.to_dict(orient="records")}), 200
+
+# ✅ Compound Query Planner
+def validate_predicate(predicate):
+    """Check a predicate's shape; raises ValueError with a client-facing message."""
+    if not isinstance(predicate, dict):
+        raise ValueError("Each predicate must be an object")
+
+    kind = predicate.get("type")
+    if kind in ("exact", "range"):
+        field = predicate.get("field")
+        if not isinstance(field, str) or not field:
+            raise ValueError(f"{kind.capitalize()} predicates need a string 'field'")
+
+    if kind == "exact":
+        if not is_number(predicate.get("value")) and not isinstance(predicate.get("value"), str):
+            raise ValueError("Exact predicates need a string or numeric 'value'")
+        if field not in data_store.columns or field in ENCRYPTED_FIELDS:
+            raise ValueError(f"Unsupported exact-match field: {field}")
+    elif kind == "range":
+        if not all(is_number(predicate.get(bound)) for bound in ("min_value", "max_value")):
+            raise ValueError("Range predicates need numeric 'min_value' and 'max_value'")
+        if field not in ENCRYPTED_FIELDS and field not in column_ranges:
+            raise ValueError(f"Unsupported range field: {field}")
+    elif kind == "knn":
+        if not all(is_number(predicate.get(axis)) for axis in ("latitude", "longitude")):
+            raise ValueError("KNN predicates need numeric 'latitude' and 'longitude'")
+        k = predicate.get("k", 5)
+        if not isinstance(k, int) or isinstance(k, bool) or k < 1:
+            raise ValueError("KNN 'k' must be a positive integer")
+    else:
+        raise ValueError(f"Unknown predicate type: {kind}")
+
+def estimate_rows(predicate):
+    """Estimate how many rows survive a filter predicate, from cheap statistics only."""
+    total = len(data_store)
+    field = predicate["field"]
+
+    if predicate["type"] == "exact":
+        if field in BLOOM_FIELDS and not bloom_filter.lookup(field, str(predicate["value"]).strip().lower()):
+            return 0  # Bloom negatives are exact: nothing can match
+        return total / max(column_cardinality.get(field, 1), 1)
+
+    if field in ENCRYPTED_FIELDS:
+        return total * ENCRYPTED_RANGE_SELECTIVITY
+
+    low, high = column_ranges[field]
+    if high <= low:
+        return total if predicate["min_value"] <= low <= predicate["max_value"] else 0
+    overlap = min(high, predicate["max_value"]) - max(low, predicate["min_value"])
+    return total * max(0.0, min(1.0, overlap / (high - low)))  # Uniform-distribution assumption
+
+def decrypt_billing_rows(row_ids):
+    """Decrypt only the packed ciphertexts that hold the given rows; returns ({row_id: value}, decryptions)."""
+    values, chunks = {}, sorted({row_id // PACKING_FACTOR for row_id in row_ids})
+    for chunk in chunks:
+        slots = decrypt_packed([billing_amount_packed[chunk]], min(PACKING_FACTOR, len(data_store) - chunk * PACKING_FACTOR))
+        for slot, value in enumerate(slots):
+            values[chunk * PACKING_FACTOR + slot] = value
+    return {row_id: values[row_id] for row_id in row_ids}, len(chunks)
+
+def apply_filter(predicate, row_ids):
+    """Run a filter predicate over the candidate row ids only; returns (surviving ids, step details)."""
+    field, details = predicate["field"], {}
+
+    if predicate["type"] == "exact":
+        value = str(predicate["value"]).strip().lower()
+        if field in BLOOM_FIELDS and not bloom_filter.lookup(field, value):
+            return [], {"bloom_negative": True}
+        column = data_store.loc[row_ids, field].dropna()
+        return column.index[column.astype(str).str.lower().str.strip() == value].tolist(), details
+
+    min_val, max_val = predicate["min_value"], predicate["max_value"]
+    if field in ENCRYPTED_FIELDS:
+        values, details["decryptions"] = decrypt_billing_rows(row_ids)
+        return [row_id for row_id in row_ids if min_val <= values[row_id] <= max_val], details
+
+    column = data_store.loc[row_ids, field]
+    return column.index[(column >= min_val) & (column <= max_val)].tolist(), details
+
+def apply_knn(predicate, row_ids):
+    """Rank the surviving rows by distance and keep the k nearest; returns (ids, step details)."""
+    latitude, longitude, k = predicate["latitude"], predicate["longitude"], int(predicate.get("k", 5))
+
+    if predicate.get("encrypted"):
+        candidate_ids = grid_candidates(grid_index, latitude, longitude, k, GRID_CELL_DEGREES, allowed=set(row_ids))
+        if not candidate_ids:
+            return [], {"grid_candidates": 0}
+        return encrypted_knn_row_ids(candidate_ids, latitude, longitude, k), {"grid_candidates": len(candidate_ids)}
+
+    rows = data_store.loc[row_ids]
+    distance = ((rows["latitude"] - latitude) ** 2 + (rows["longitude"] - longitude) ** 2) ** 0.5
+    return distance.dropna().nsmallest(k).index.tolist(), {}
+
+def plan_query(predicates):
+    """Order plaintext filters by estimated surviving rows, then encrypted ones; KNN always ranks last.
+
+    Encrypted filters pay a Paillier decryption per candidate chunk, so they only ever see rows that
+    survived every plaintext filter. KNN is a top-k over the rows matching every other predicate,
+    so it cannot be reordered.
+    """
+    filters = [(predicate["field"] in ENCRYPTED_FIELDS, estimate_rows(predicate), position, predicate)
+               for position, predicate in enumerate(predicates) if predicate["type"] != "knn"]
+    plan = [{"predicate": predicate, "estimated_rows": round(estimate, 2)}
+            for _, estimate, _, predicate in sorted(filters, key=lambda f: f[:3])]
+
+    for predicate in predicates:
+        if predicate["type"] == "knn":
+            # Bounded by k and the rows it can rank; apply_knn does the single grid scan
+            searchable = len(encrypted_points) if predicate.get("encrypted") else len(data_store)
+            plan.append({"predicate": predicate, "estimated_rows": min(int(predicate.get("k", 5)), searchable)})
+    return plan
+
+@app.route('/query', methods=['POST'])
+def compound_query():
+    """Conjunction of exact, range and KNN predicates, executed most selective first on shrinking candidates."""
+    access_token = request.headers.get("Authorization")
+    query_token = request.headers.get("Query-Token")
+
+    if not token_manager.validate_query_token(access_token, query_token):
+        return jsonify({"error": "Unauthorized query"}), 401
+
+    request_data = request.get_json(silent=True)
+    if not isinstance(request_data, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    predicates = request_data.get("predicates")
+    fields = request_data.get("fields", DEFAULT_PROJECTION)
+
+    if not predicates or not isinstance(predicates, list):
+        return jsonify({"error": "'predicates' must be a non-empty list"}), 400
+    if not fields or not isinstance(fields, list) or not all(isinstance(field, str) for field in fields):
+        return jsonify({"error": "'fields' must be a non-empty list of field names"}), 400
+    invalid_fields = [field for field in fields if field not in data_store.columns or field in ENCRYPTED_FIELDS]
+    if invalid_fields:
+        return jsonify({"error": f"Fields cannot be projected: {invalid_fields}"}), 400
+
+    try:
+        for predicate in predicates:
+            validate_predicate(predicate)
+        if sum(1 for predicate in predicates if predicate["type"] == "knn") > 1:
+            raise ValueError("At most one KNN predicate is supported")
+        plan = plan_query(predicates)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    row_ids = data_store.index.tolist()
+    try:
+        for step in plan:
+            step["rows_in"] = len(row_ids)
+            if not row_ids:
+                step["skipped"] = True
+            elif step["predicate"]["type"] == "knn":
+                row_ids, details = apply_knn(step["predicate"], row_ids)
+                step.update(details)
+            else:
+                row_ids, details = apply_filter(step["predicate"], row_ids)
+                step.update(details)
+            step["rows_out"] = len(row_ids)
+    except requests.HTTPError as e:
+        return jsonify(e.response.json()), e.response.status_code
+    except requests.RequestException as e:
+        return jsonify({"error": f"Failed to reach Server 2: {str(e)}"}), 502
+
+    results = data_store.loc[row_ids, fields].drop_duplicates().dropna()
+    response = {"results": results.to_dict(orient="records")}
+    if request_data.get("explain"):
+        response["plan"] = plan
+    return jsonify(response), 200
+
+# ✅ Homomorphic Sum API
+@app.route('/homomorphic_sum', methods=['POST'])
+def homomorphic_sum():
+    """Aggregate packed billing ciphertexts slot-wise without decrypting them."""
+    try:
+        encrypted_sum = packed_addition(*billing_amount_packed)
+        return jsonify({
+            "encrypted_sum": str(encrypted_sum.ciphertext(be_secure=False)),
+            "packed": True,
+            "slots": min(PACKING_FACTOR, len(data_store))
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": f"Internal Server Error: {str(e)}"}), 500
+
 # ✅ Decrypt Sum API
 @app.route('/decrypt_sum', methods=['POST'])
 def decrypt_sum():
@@ -163,6 +477,11 @@ def decrypt_sum():
         if not encrypted_sum:
             return jsonify({"error": "Missing encrypted_sum"}), 400
 
+        if data.get("packed"):
+            # Server 2 decrypts the packed sum once and returns every slot's partial sum
+            response = requests.post(f"{SERVER_2_URL}/decrypt_packed", json={"encrypted_packed": [encrypted_sum], "count": data.get("slots")})
+            return jsonify(response.json()), response.status_code
+
         response = requests.post(f"{SERVER_2_URL}/decrypt_sum", json={"encrypted_sum": encrypted_sum})
 
         return jsonify(response.json()), response.status_code
@@ -170,7 +489,17 @@ def decrypt_sum():
     except Exception as e:
         return jsonify({"error": f"Internal Server Error: {str(e)}"}), 500
 
+# ✅ Start Warm-up once every route and hook is registered (the probe listener serves this app)
+if PREFORK:
+    # Gunicorn binds only after the preloaded app returns, so answer probes ourselves until then
+    warmup.phase("publish_shared_memory")(publish_shared_state)
+    with probe_listener(app, "0.0.0.0", SERVER_1_PORT):
+        warmup.run()
+    if not warmup.is_ready:
+        raise RuntimeError(f"Warm-up failed before forking workers: {warmup.error}")
+else:
+    warmup.start()
+
 if __name__ == "__main__":
-    SERVER_1_PORT = int(os.getenv("SERVER_1_PORT", 5001))  # Default to 5001 if not set
     print(f"[INFO] Server 1 is running on port {SERVER_1_PORT}...")
     app.run(host="0.0.0.0", port=SERVER_1_PORT, debug=True)
@@ -9,7 +9,7 @@ from phe import paillier
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # Import required cryptographic functions
-from shared.paillier import safe_decrypt, public_key, private_key, EncryptedNumber, SCALING_FACTOR
+from shared.paillier import safe_decrypt, public_key, private_key, EncryptedNumber, SCALING_FACTOR, decrypt_packed
 
 app = Flask(__name__)
 
@@ -81,6 +81,55 @@ def decrypt_sum():
     except Exception as e:
         return jsonify({"error": f"Internal Server Error: {str(e)}"}), 500
 
+# ✅ Packed Decryption API
+@app.route('/decrypt_packed', methods=['POST'])
+def decrypt_packed_values():
+    """Decrypt each packed ciphertext once and return the value of every slot."""
+    try:
+        data = request.json
+        encrypted_packed = data.get("encrypted_packed")
+        count = data.get("count")
+
+        if not encrypted_packed or not isinstance(encrypted_packed, list):
+            return jsonify({"error": "Invalid or missing 'encrypted_packed'. Expected a list."}), 400
+
+        try:
+            enc_numbers = [EncryptedNumber(public_key, int(ciphertext)) for ciphertext in encrypted_packed]
+            decrypted_values = decrypt_packed(enc_numbers, int(count) if count is not None else None)
+        except Exception as e:
+            return jsonify({"error": f"Decryption failed: {str(e)}"}), 500
+
+        return jsonify({"decrypted_values": decrypted_values, "decrypted_sum": sum(decrypted_values)}), 200
+
+    except Exception as e:
+        return jsonify({"error": f"Internal Server Error: {str(e)}"}), 500
+
+# ✅ Encrypted KNN Top-k API
+@app.route('/knn_topk', methods=['POST'])
+def knn_topk():
+    """Decrypt a batch of squared distances and return only the row ids of the k nearest."""
+    try:
+        data = request.json
+        encrypted_distances = data.get("encrypted_distances")
+        row_ids = data.get("row_ids")
+        k = int(data.get("k", 5))
+
+        if not encrypted_distances or not isinstance(encrypted_distances, list):
+            return jsonify({"error": "Invalid or missing 'encrypted_distances'. Expected a list."}), 400
+        if not isinstance(row_ids, list) or len(row_ids) != len(encrypted_distances):
+            return jsonify({"error": "'row_ids' must be a list matching 'encrypted_distances'."}), 400
+
+        try:
+            distances = [private_key.decrypt(EncryptedNumber(public_key, int(ciphertext))) for ciphertext in encrypted_distances]
+        except Exception as e:
+            return jsonify({"error": f"Decryption failed: {str(e)}"}), 500
+
+        nearest = sorted(zip(distances, row_ids))[:k]
+        return jsonify({"row_ids": [row_id for _, row_id in nearest]}), 200
+
+    except Exception as e:
+        return jsonify({"error": f"Internal Server Error: {str(e)}"}), 500
+
 # ✅ Homomorphic Operations API
 @app.route('/homomorphic_operations', methods=['POST'])
 def homomorphic_operations():
@@ -0,0 +1,130 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import jsonify, request
+from werkzeug.serving import make_server
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+class WarmUp:
+    """Runs a server's heavy initialization phases in a background thread and reports progress."""
+    def __init__(self, name):
+        self.name = name
+        self.phases = []
+        self.state = "pending"  # pending -> starting -> ready | failed
+        self.current_phase = None
+        self.completed_phases = []
+        self.progress = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def phase(self, name):
+        """Decorator registering a warm-up phase; phases run in registration order."""
+        def register(func):
+            self.phases.append((name, func))
+            return func
+        return register
+
+    def report_progress(self, done, total):
+        """Report progress inside the current phase (e.g. rows processed)."""
+        with self._lock:
+            self.progress = {"done": done, "total": total}
+
+    def start(self):
+        """Start the warm-up thread; the caller keeps going and can bind its port immediately."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self.run, name=f"{self.name}-warmup", daemon=True)
+        self._thread.start()
+
+    def run(self):
+        """Run every phase in the calling thread (used directly when warm-up must finish before forking)."""
+        self.state = "starting"
+        self.started_at = time.time()
+        for name, func in self.phases:
+            with self._lock:
+                self.current_phase, self.progress = name, None
+            phase_start = time.time()
+            logging.info(f"🚀 [{self.name}] Warm-up phase '{name}' started")
+            try:
+                func()
+            except Exception as e:
+                logging.error(f"❌ [{self.name}] Warm-up phase '{name}' failed: {e}")
+                with self._lock:
+                    self.state, self.error = "failed", f"{name}: {e}"
+                    self.finished_at = time.time()
+                return
+            elapsed = round(time.time() - phase_start, 3)
+            logging.info(f"✅ [{self.name}] Warm-up phase '{name}' finished in {elapsed}s")
+            with self._lock:
+                self.completed_phases.append({"phase": name, "seconds": elapsed})
+
+        with self._lock:
+            self.state, self.current_phase, self.progress = "ready", None, None
+            self.finished_at = time.time()
+
+    @property
+    def is_ready(self):
+        return self.state == "ready"
+
+    def status(self):
+        """Snapshot of the warm-up state for the probe endpoints."""
+        with self._lock:
+            return {
+                "state": self.state,
+                "current_phase": self.current_phase,
+                "progress": self.progress,
+                "completed_phases": list(self.completed_phases),
+                "total_phases": len(self.phases),
+                "error": self.error,
+                "elapsed_seconds": round((self.finished_at or time.time()) - self.started_at, 3) if self.started_at else None
+            }
+
+PROBE_ENDPOINTS = ("health_check", "readiness_check")
+
+def register_probes(app, warmup):
+    """Add /health (liveness) and /ready (readiness) to `app` and hold other requests until warm-up is done."""
+    @app.route('/health', methods=['GET'])
+    def health_check():
+        """Liveness: the process is up and serving, even while warm-up is still running."""
+        status = warmup.status()
+        if status["state"] == "failed":
+            return jsonify({"status": "failed", "error": status["error"]}), 500
+        return jsonify({"status": "running", "state": status["state"]}), 200
+
+    @app.route('/ready', methods=['GET'])
+    def readiness_check():
+        """Readiness: 200 once every warm-up phase has completed, 503 with progress until then."""
+        status = warmup.status()
+        return jsonify(status), 200 if warmup.is_ready else 503
+
+    @app.before_request
+    def require_warmup():
+        """Reject non-probe requests with 503 until the server is ready."""
+        if request.endpoint not in PROBE_ENDPOINTS and not warmup.is_ready:
+            return jsonify({"error": "Server is warming up", **warmup.status()}), 503
+
+@contextmanager
+def probe_listener(app, host, port):
+    """Serve `app` from a background thread for the duration of the block.
+
+    Used by the pre-fork master, which must finish warm-up before the real server binds:
+    probes get live 503/progress answers instead of connection refused. The socket is
+    closed on exit so the real server can bind the same port.
+    """
+    server = make_server(host, port, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, name="probe-listener", daemon=True)
+    thread.start()
+    logging.info(f"🚀 Probe listener serving /health and /ready on {host}:{port} during warm-up")
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
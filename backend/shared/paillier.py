@@ -1,14 +1,79 @@
+import json
+import logging
+import os
+import threading
 from phe import paillier, EncryptedNumber
 
 # Generate a Paillier keypair with a reduced key size to avoid massive ciphertexts
 KEY_SIZE = 1024  # Reduce from 2048+ to 1024 for smaller encrypted numbers
-public_key, private_key = paillier.generate_paillier_keypair(n_length=KEY_SIZE)
+
+# Server 1 encrypts and Server 2 decrypts, so both must load the same keypair from this file
+# (a mounted secret or shared volume). Without it each process generates its own key.
+KEY_PATH = os.getenv("PAILLIER_KEY_PATH")
+
+# The keypair is loaded or generated on first use rather than at import, so servers can bind a port first
+_keypair = None
+_keypair_lock = threading.Lock()
+
+def save_keypair(public_key, private_key, path):
+    """Write the keypair to `path` atomically; raises FileExistsError if another process got there first."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump({"n": public_key.n, "p": private_key.p, "q": private_key.q}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.link(tmp_path, path)  # Fails instead of overwriting an existing key
+    finally:
+        os.remove(tmp_path)
+
+def load_keypair(path):
+    """Read a keypair written by save_keypair."""
+    with open(path) as f:
+        key_data = json.load(f)
+    public_key = paillier.PaillierPublicKey(n=int(key_data["n"]))
+    return public_key, paillier.PaillierPrivateKey(public_key, int(key_data["p"]), int(key_data["q"]))
+
+def _load_or_create_keypair():
+    if not KEY_PATH:
+        logging.warning("⚠️ PAILLIER_KEY_PATH not set. Generating a process-local keypair other servers cannot use.")
+        return paillier.generate_paillier_keypair(n_length=KEY_SIZE)
+
+    if not os.path.exists(KEY_PATH):
+        public_key, private_key = paillier.generate_paillier_keypair(n_length=KEY_SIZE)
+        try:
+            save_keypair(public_key, private_key, KEY_PATH)
+            logging.info(f"✅ Paillier keypair written to {KEY_PATH}")
+            return public_key, private_key
+        except FileExistsError:
+            pass  # Another server wrote its key first; use that one
+
+    logging.info(f"✅ Paillier keypair loaded from {KEY_PATH}")
+    return load_keypair(KEY_PATH)
+
+def get_keypair():
+    """Return (public_key, private_key), loading or generating the keypair on first use."""
+    global _keypair
+    with _keypair_lock:
+        if _keypair is None:
+            _keypair = _load_or_create_keypair()
+    return _keypair
+
+def __getattr__(name):
+    """Resolve `public_key` / `private_key` lazily so `from shared.paillier import public_key` keeps working."""
+    if name == "public_key":
+        return get_keypair()[0]
+    if name == "private_key":
+        return get_keypair()[1]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Define a scaling factor to prevent overflow during encryption and summation
 SCALING_FACTOR = 1000  # Reduce encrypted value size significantly
 
 def encrypt_data(data):
     """Encrypt numeric data with scaling to prevent large ciphertexts."""
+    public_key, _ = get_keypair()
     if isinstance(data, list):
         return [public_key.encrypt(int(value) // SCALING_FACTOR) for value in data]
     return public_key.encrypt(int(data) // SCALING_FACTOR)
@@ -21,6 +86,7 @@ def decrypt_data(encrypted_data):
 
 def safe_decrypt(enc_num):
     """Safely decrypt an encrypted number and correct any modular overflow issues."""
+    public_key, private_key = get_keypair()
     decrypted_value = private_key.decrypt(enc_num)
 
     # Correct modular overflow
@@ -37,6 +103,7 @@ def homomorphic_addition(*enc_nums):
     if not enc_nums:
         raise ValueError("At least one encrypted number must be provided.")
 
+    public_key, _ = get_keypair()
     n_squared = public_key.n ** 2  # Define the modulus squared to prevent overflow
     result_ciphertext = sum(num.ciphertext() for num in enc_nums) % n_squared  # Apply modular reduction
 
@@ -49,3 +116,93 @@ def homomorphic_multiplication(enc_num, scalar):
     if not isinstance(scalar, (int, float)):
         raise TypeError("Scalar must be an integer or float.")
     return enc_num * scalar
+
+# Slot packing: many small scaled values share one plaintext, each in a fixed-width slot.
+# Values are bounded to PACKING_VALUE_BITS; the remaining bits of each slot are headroom
+# so that up to 2 ** (PACKING_SLOT_BITS - PACKING_VALUE_BITS) packed ciphertexts can be
+# added slot-wise without one slot carrying into the next.
+PACKING_SLOT_BITS = 64
+PACKING_VALUE_BITS = 32
+PACKING_FACTOR = (KEY_SIZE - 2 * PACKING_SLOT_BITS) // PACKING_SLOT_BITS  # Stay well below n // 3 (phe's max_int)
+
+def pack_values(values):
+    """Pack a list of bounded non-negative integers into a single plaintext integer."""
+    if len(values) > PACKING_FACTOR:
+        raise ValueError(f"At most {PACKING_FACTOR} values can be packed into one plaintext.")
+
+    packed = 0
+    for slot, value in enumerate(values):
+        value = int(value)
+        if value < 0 or value >= (1 << PACKING_VALUE_BITS):
+            raise ValueError(f"Value {value} does not fit in a {PACKING_VALUE_BITS}-bit slot.")
+        packed |= value << (slot * PACKING_SLOT_BITS)
+    return packed
+
+def unpack_values(packed, count=PACKING_FACTOR):
+    """Split a packed plaintext integer back into its first `count` slot values."""
+    mask = (1 << PACKING_SLOT_BITS) - 1
+    return [(packed >> (slot * PACKING_SLOT_BITS)) & mask for slot in range(count)]
+
+def encrypt_packed(data):
+    """Encrypt numeric data with scaling, packing PACKING_FACTOR values per ciphertext."""
+    public_key, _ = get_keypair()
+    scaled = [max(0, int(value) // SCALING_FACTOR) for value in data]
+    return [
+        public_key.encrypt(pack_values(scaled[i:i + PACKING_FACTOR]))
+        for i in range(0, len(scaled), PACKING_FACTOR)
+    ]
+
+def decrypt_packed(encrypted_packed, count=None):
+    """Decrypt packed ciphertexts once each and return every slot, scaled back to original values."""
+    _, private_key = get_keypair()
+    if isinstance(encrypted_packed, EncryptedNumber):
+        encrypted_packed = [encrypted_packed]
+    if count is None:
+        count = len(encrypted_packed) * PACKING_FACTOR
+
+    values = []
+    for enc_num in encrypted_packed:
+        slots = min(PACKING_FACTOR, count - len(values))
+        if slots <= 0:
+            break
+        values.extend(unpack_values(private_key.decrypt(enc_num), slots))
+    return [value * SCALING_FACTOR for value in values]
+
+def packed_addition(*enc_nums):
+    """Add packed ciphertexts slot-wise; the result decrypts to the per-slot sums."""
+    if not enc_nums:
+        raise ValueError("At least one encrypted number must be provided.")
+    if len(enc_nums) > (1 << (PACKING_SLOT_BITS - PACKING_VALUE_BITS)):
+        raise ValueError("Too many packed ciphertexts to add without slot overflow.")
+
+    result = enc_nums[0]
+    for enc_num in enc_nums[1:]:
+        result = result + enc_num  # Paillier addition multiplies ciphertexts mod n^2
+    return result
+
+# Fixed-point encoding for encrypted coordinates (4 decimal places ≈ 11 m at the equator)
+COORDINATE_SCALE = 10 ** 4
+
+def encode_coordinate(value):
+    """Encode a float coordinate as a fixed-point integer."""
+    return int(round(float(value) * COORDINATE_SCALE))
+
+def encrypt_coordinates(latitude, longitude):
+    """Encrypt a point as (E(x), E(y), E(x^2 + y^2)) so squared distances can be computed homomorphically."""
+    public_key, _ = get_keypair()
+    x, y = encode_coordinate(latitude), encode_coordinate(longitude)
+    return public_key.encrypt(x), public_key.encrypt(y), public_key.encrypt(x * x + y * y)
+
+def encrypted_squared_distance(encrypted_point, latitude, longitude):
+    """Compute E(|p - q|^2) from an encrypted point p and a plaintext query point q."""
+    enc_x, enc_y, enc_norm = encrypted_point
+    qx, qy = encode_coordinate(latitude), encode_coordinate(longitude)
+    # |p - q|^2 = (x^2 + y^2) - 2(x*qx + y*qy) + (qx^2 + qy^2)
+    return enc_norm + enc_x * (-2 * qx) + enc_y * (-2 * qy) + (qx * qx + qy * qy)
+
+if __name__ == "__main__":
+    # Pre-generate the shared keypair, e.g. for a Kubernetes secret: python -m shared.paillier <path>
+    import sys
+    target = sys.argv[1] if len(sys.argv) > 1 else "paillier_key.json"
+    save_keypair(*paillier.generate_paillier_keypair(n_length=KEY_SIZE), target)
+    print(f"[INFO] Paillier keypair written to {target}")
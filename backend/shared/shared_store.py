@@ -0,0 +1,131 @@
+import logging
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from phe import EncryptedNumber
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+class SharedArrayStore:
+    """Packs named numpy arrays into one shared memory block and exposes read-only views.
+
+    The parent process builds the store once; workers forked afterwards inherit the mapping,
+    so every worker reads the same physical pages instead of holding its own copy.
+    """
+    def __init__(self, arrays, name=None):
+        layout, offset = {}, 0
+        for key, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            offset = (offset + 63) // 64 * 64  # Keep every array cache-line aligned
+            layout[key] = (offset, array.shape, array.dtype.str)
+            offset += array.nbytes
+
+        self.layout = layout
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=max(offset, 1))
+        self.views = {}
+        for key, array in arrays.items():
+            start, shape, dtype = layout[key]
+            view = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=start)
+            view[...] = array
+            view.flags.writeable = False
+            self.views[key] = view
+
+        logging.info(f"✅ Shared store '{self.shm.name}' created ({offset} bytes, {len(arrays)} arrays)")
+
+    def __getitem__(self, key):
+        return self.views[key]
+
+    @property
+    def nbytes(self):
+        return self.shm.size
+
+    def close(self, unlink=False):
+        """Release the views and the mapping; only the creating process should unlink."""
+        self.views.clear()
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+def ciphertexts_to_array(enc_nums, width):
+    """Serialize EncryptedNumbers into a (len, width) uint8 array of big-endian ciphertexts."""
+    array = np.zeros((len(enc_nums), width), dtype=np.uint8)
+    for i, enc_num in enumerate(enc_nums):
+        array[i] = np.frombuffer(enc_num.ciphertext(be_secure=False).to_bytes(width, "big"), dtype=np.uint8)
+    return array
+
+class CiphertextArray:
+    """Sequence view over a flat ciphertext buffer that rebuilds EncryptedNumbers on access.
+
+    A (len, width) buffer yields one EncryptedNumber per index; a (len, k, width) buffer yields a k-tuple.
+    """
+    def __init__(self, public_key, buffer):
+        self.public_key = public_key
+        self.buffer = buffer
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def _decode(self, row):
+        return EncryptedNumber(self.public_key, int.from_bytes(row.tobytes(), "big"))
+
+    def __getitem__(self, index):
+        row = self.buffer[index]
+        if row.ndim == 2:
+            return tuple(self._decode(part) for part in row)
+        return self._decode(row)
+
+    def __iter__(self):
+        for index in range(len(self.buffer)):
+            yield self[index]
+
+def groups_to_csr(groups):
+    """Flatten {key: [ids]} into (keys, offsets, ids) arrays for a CSRIndex."""
+    keys = list(groups)
+    offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(groups[key]) for key in keys])
+    ids = np.fromiter((row_id for key in keys for row_id in groups[key]), dtype=np.int64, count=int(offsets[-1]))
+    return np.array(keys, dtype=np.int64).reshape(len(keys), -1), offsets, ids
+
+class CSRIndex:
+    """Read-only {key: ids} lookup over flat CSR arrays; only the small key -> slot map is a Python object."""
+    def __init__(self, keys, offsets, ids):
+        self.slots = {tuple(int(part) for part in key): slot for slot, key in enumerate(keys)}
+        self.offsets = offsets
+        self.ids = ids
+
+    def get(self, key, default=None):
+        slot = self.slots.get(key)
+        if slot is None:
+            return default
+        return self.ids[self.offsets[slot]:self.offsets[slot + 1]].tolist()
+
+    def __len__(self):
+        return len(self.slots)
+
+def dataframe_to_arrays(frame, prefix="column:"):
+    """Split a DataFrame into flat arrays: numeric columns as-is, text columns as categorical codes.
+
+    Returns (arrays, categories); `categories` holds the distinct values of each text column,
+    which stay ordinary Python objects.
+    """
+    arrays, categories = {}, {}
+    for column in frame.columns:
+        if pd.api.types.is_numeric_dtype(frame[column]):
+            arrays[prefix + column] = frame[column].to_numpy()
+        else:
+            categorical = pd.Categorical(frame[column])
+            arrays[prefix + column] = categorical.codes
+            categories[column] = categorical.categories
+    return arrays, categories
+
+def arrays_to_dataframe(store, columns, categories, prefix="column:"):
+    """Rebuild a DataFrame whose columns are zero-copy views into the shared store."""
+    data = {}
+    for column in columns:
+        if column in categories:
+            data[column] = pd.Categorical.from_codes(store[prefix + column], categories=categories[column])
+        else:
+            data[column] = store[prefix + column]
+    return pd.DataFrame(data, copy=False)
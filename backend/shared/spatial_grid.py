@@ -0,0 +1,43 @@
+import math
+
+def grid_cell(latitude, longitude, cell_degrees):
+    """Map a coordinate to its coarse public grid cell."""
+    return math.floor(latitude / cell_degrees), math.floor(longitude / cell_degrees)
+
+def build_grid(points, cell_degrees):
+    """Group row ids by grid cell; `points` maps row id -> (latitude, longitude)."""
+    grid_index = {}
+    for row_id, (latitude, longitude) in points.items():
+        grid_index.setdefault(grid_cell(latitude, longitude, cell_degrees), []).append(row_id)
+    return grid_index
+
+def grid_candidates(grid_index, latitude, longitude, k, cell_degrees, allowed=None):
+    """Collect row ids from rings of cells around the query, enough to contain the exact k nearest.
+
+    Once k rows are found by ring r, each of them is within (r + 1) * cell * sqrt(2) of the query,
+    so scanning stops at the first ring whose nearest possible point is farther than that.
+    If `allowed` is given, only those row ids are collected (and counted towards k).
+    """
+    center_lat, center_lon = grid_cell(latitude, longitude, cell_degrees)
+    # Distance from the query to the closest edge of its own cell
+    edge = min(
+        latitude - center_lat * cell_degrees, (center_lat + 1) * cell_degrees - latitude,
+        longitude - center_lon * cell_degrees, (center_lon + 1) * cell_degrees - longitude
+    )
+    max_ring = math.ceil(360 / cell_degrees)
+    candidates, bound = [], None
+
+    for ring in range(max_ring + 1):
+        if bound is not None and (ring - 1) * cell_degrees + edge > bound:
+            break  # No point in this ring or beyond can beat the k already found
+
+        for d_lat in range(-ring, ring + 1):
+            for d_lon in range(-ring, ring + 1):
+                if max(abs(d_lat), abs(d_lon)) == ring:  # Only the cells on this ring's border
+                    cell_rows = grid_index.get((center_lat + d_lat, center_lon + d_lon), [])
+                    candidates.extend(cell_rows if allowed is None else [row_id for row_id in cell_rows if row_id in allowed])
+
+        if bound is None and len(candidates) >= k:
+            bound = (ring + 1) * cell_degrees * math.sqrt(2)
+
+    return candidates
@@ -3,6 +3,8 @@ import logging
 import os
 import secrets
 import socket
+import threading
+import time
 
 # ✅ Set IS_CLOUD to False since you want to connect to local Redis
 IS_CLOUD = False
@@ -16,30 +18,92 @@ USE_SSL = IS_CLOUD  # Only enable SSL for Azure Redis
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# ✅ Redis Connection Logic
-try:
-    logging.info(f"🚀 Connecting to Redis at {REDIS_HOST}:{REDIS_PORT}")
-    r = redis.StrictRedis(
-        host=REDIS_HOST,
-        port=REDIS_PORT,
-        password=REDIS_PASSWORD,
-        ssl=USE_SSL,
-        ssl_cert_reqs=None if USE_SSL else None
-    )
-    r.ping()  # Test connection
-    logging.info("✅ Redis Connection Successful!")
-except redis.ConnectionError as e:
-    logging.error(f"❌ Redis Connection Failed: {e}")
-    r = None
+# ✅ Retry Settings for the lazy Redis connection
+REDIS_CONNECT_RETRIES = int(os.getenv("REDIS_CONNECT_RETRIES", 5))
+REDIS_BACKOFF_BASE = float(os.getenv("REDIS_BACKOFF_BASE", 0.5))  # Seconds before the first retry
+REDIS_BACKOFF_MAX = float(os.getenv("REDIS_BACKOFF_MAX", 8.0))
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", 2.0))  # Seconds per connection attempt
+REDIS_RETRY_COOLDOWN = float(os.getenv("REDIS_RETRY_COOLDOWN", 5.0))  # Request-path pause after a failure
+
+_redis_client = None
+_redis_retry_at = 0.0  # Before this time, non-blocking callers skip reconnecting
+_redis_lock = threading.Lock()
+
+def get_redis_client(retries=REDIS_CONNECT_RETRIES, blocking=True):
+    """Connect to Redis on first use, retrying with exponential backoff. Returns None if unreachable.
+
+    With blocking=False (the request path) this never waits: it returns None straight away while
+    another thread is connecting or during the cooldown that follows a failed attempt.
+    """
+    global _redis_client, _redis_retry_at
+    if _redis_client is not None:
+        return _redis_client
+    if not blocking and time.monotonic() < _redis_retry_at:
+        return None
+    if not _redis_lock.acquire(blocking=blocking):
+        return None
+
+    try:
+        if _redis_client is not None:
+            return _redis_client
+
+        delay = REDIS_BACKOFF_BASE
+        for attempt in range(1, retries + 1):
+            try:
+                logging.info(f"🚀 Connecting to Redis at {REDIS_HOST}:{REDIS_PORT} (attempt {attempt}/{retries})")
+                client = redis.StrictRedis(
+                    host=REDIS_HOST,
+                    port=REDIS_PORT,
+                    password=REDIS_PASSWORD,
+                    ssl=USE_SSL,
+                    ssl_cert_reqs=None if USE_SSL else None,
+                    socket_connect_timeout=REDIS_CONNECT_TIMEOUT
+                )
+                client.ping()  # Test connection
+                logging.info("✅ Redis Connection Successful!")
+                _redis_client = client
+                return _redis_client
+            except (redis.ConnectionError, redis.TimeoutError) as e:
+                logging.error(f"❌ Redis Connection Failed: {e}")
+                if attempt < retries:
+                    time.sleep(delay)
+                    delay = min(delay * 2, REDIS_BACKOFF_MAX)
+
+        _redis_retry_at = time.monotonic() + REDIS_RETRY_COOLDOWN
+        return None
+    finally:
+        _redis_lock.release()
+
+def wait_for_redis(on_retry=None):
+    """Block until Redis answers, repeating the backoff loop of get_redis_client as long as needed.
+
+    Used by warm-up so a Redis that starts slowly delays readiness instead of failing it;
+    `on_retry(rounds)` is called after every failed round to report progress.
+    """
+    rounds = 0
+    while True:
+        client = get_redis_client()
+        if client is not None:
+            return client
+        rounds += 1
+        if on_retry:
+            on_retry(rounds)
+        time.sleep(REDIS_BACKOFF_MAX)
 
 class TokenManager:
     def __init__(self):
-        """Initialize Token Manager with Redis Connection"""
-        if r:
-            self.redis_client = r
-        else:
-            self.redis_client = None  # Redis client not initialized due to connection failure
-            logging.warning("⚠️ Redis not available. Fallback to other storage mechanisms.")
+        """Initialize Token Manager; the Redis connection is opened lazily on first use."""
+        self._redis_client = None
+
+    @property
+    def redis_client(self):
+        """Redis client, connected on first access (None while Redis is unreachable)."""
+        if self._redis_client is None:
+            # A single non-blocking attempt on the request path; warm-up does the patient retry loop
+            self._redis_client = get_redis_client(retries=1, blocking=False)
+            if self._redis_client is None:
+                logging.warning("⚠️ Redis not available. Fallback to other storage mechanisms.")
+        return self._redis_client
 
     def generate_access_token(self, user_id):
         """Generate and store an access token for a user."""
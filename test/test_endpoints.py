@@ -1,4 +1,17 @@
+import csv
+import os
+import sys
+import threading
+import time
+import redis
 import requests
+from flask import Flask, jsonify
+
+# Add backend to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+from shared import token_manager
+from shared.lifecycle import WarmUp, register_probes
+from shared.paillier import PACKING_FACTOR, SCALING_FACTOR
 
 BASE_URL_SERVER_0 = "http://127.0.0.1:5000"
 BASE_URL_SERVER_1 = "http://127.0.0.1:5001"
@@ -7,7 +20,7 @@ BASE_URL_SERVER_2 = "http://127.0.0.1:5002"
 # Test Token Generation
 def test_generate_token():
     payload = {"username": "testuser", "password": "testpassword"}
-    response = requests.post(f"{http://127.0.0.1:5000}/generate_token", json=payload)
+    response = requests.post(f"{BASE_URL_SERVER_0}/generate_token", json=payload)
     assert response.status_code == 200
     assert "access_token" in response.json()
 
@@ -15,7 +28,7 @@ def test_generate_token():
 def test_generate_query_token():
     access_token = "test_access_token"  # Replace with a valid token if needed
     headers = {"Authorization": f"Bearer {access_token}"}
-    response = requests.post(f"{http://127.0.0.1:5000}/generate_query_token", headers=headers)
+    response = requests.post(f"{BASE_URL_SERVER_0}/generate_query_token", headers=headers)
     assert response.status_code == 200
     assert "query_token" in response.json()
 
@@ -28,7 +41,7 @@ def test_exact_match_query():
         "Query-Token": query_token
     }
     payload = {"field": "name", "value": "John Doe"}
-    response = requests.post(f"{http://127.0.0.1:5001}/exact_match", headers=headers, json=payload)
+    response = requests.post(f"{BASE_URL_SERVER_1}/exact_match", headers=headers, json=payload)
     assert response.status_code == 200 or response.status_code == 404  # Either success or not found
 
 # Test Range Query
@@ -40,7 +53,7 @@ def test_range_query():
         "Query-Token": query_token
     }
     payload = {"field": "billing_amount", "min": 100, "max": 500}
-    response = requests.post(f"{http://127.0.0.1:5001}/range_query", headers=headers, json=payload)
+    response = requests.post(f"{BASE_URL_SERVER_1}/range_query", headers=headers, json=payload)
     assert response.status_code == 200
     assert "results" in response.json()
 
@@ -52,7 +65,7 @@ def test_homomorphic_sum():
         "Authorization": f"Bearer {access_token}",
         "Query-Token": query_token
     }
-    response = requests.post(f"{http://127.0.0.1:5001}/homomorphic_sum", headers=headers)
+    response = requests.post(f"{BASE_URL_SERVER_1}/homomorphic_sum", headers=headers)
     assert response.status_code == 200
     assert "encrypted_sum" in response.json()
 
@@ -60,7 +73,206 @@ def test_homomorphic_sum():
 def test_decrypt_sum():
     encrypted_sum = "test_encrypted_sum"  # Replace with valid encrypted data
     payload = {"encrypted_sum": encrypted_sum}
-    response = requests.post(f"{http://127.0.0.1:5002}/decrypt", json=payload)
+    response = requests.post(f"{BASE_URL_SERVER_2}/decrypt", json=payload)
     assert response.status_code == 200
     assert "decrypted_result" in response.json()
 
+
+# Helpers for tests that need real tokens
+DATASET_PATH = os.path.join(os.path.dirname(__file__), "..", "backend", "dataset", "reduced_healthcare_dataset.csv")
+
+def get_query_headers(query):
+    token = requests.post(f"{BASE_URL_SERVER_0}/generate_token", json={"user_id": "testuser"}).json()["token"]
+    query_token = requests.post(f"{BASE_URL_SERVER_0}/generate_query_token", headers={"Authorization": token}, json={"query": query}).json()["query_token"]
+    return {"Authorization": token, "Query-Token": query_token}
+
+def load_rows():
+    with open(DATASET_PATH, newline="") as f:
+        return list(csv.DictReader(f))
+
+# Test Packed Homomorphic Sum decrypted by Server 2
+def test_packed_homomorphic_sum_matches_plaintext():
+    headers = get_query_headers("homomorphic_sum")
+    response = requests.post(f"{BASE_URL_SERVER_1}/homomorphic_sum", headers=headers)
+    assert response.status_code == 200
+    packed_sum = response.json()
+    assert packed_sum["packed"] is True
+
+    response = requests.post(f"{BASE_URL_SERVER_1}/decrypt_sum", headers=headers, json={
+        "encrypted_sum": packed_sum["encrypted_sum"], "packed": True, "slots": packed_sum["slots"]
+    })
+    assert response.status_code == 200
+
+    # Row i lives in slot i % PACKING_FACTOR; values are scaled down, then back up, by SCALING_FACTOR
+    expected_slots = [0] * packed_sum["slots"]
+    for i, row in enumerate(load_rows()):
+        expected_slots[i % PACKING_FACTOR] += int(float(row["billing_amount"] or 0)) // SCALING_FACTOR * SCALING_FACTOR
+    assert response.json()["decrypted_values"] == expected_slots
+    assert response.json()["decrypted_sum"] == sum(expected_slots)
+
+# Test KNN over Encrypted Coordinates
+def test_encrypted_knn_matches_plaintext_knn():
+    headers = get_query_headers("knn_query")
+    for latitude, longitude, k in [(0.1, 0.1, 1), (11.1, -173.5, 3), (-45.0, 60.0, 5)]:
+        payload = {"latitude": latitude, "longitude": longitude, "k": k}
+        plaintext = requests.post(f"{BASE_URL_SERVER_1}/knn_query", headers=headers, json=payload)
+        encrypted = requests.post(f"{BASE_URL_SERVER_1}/knn_query", headers=headers, json={**payload, "encrypted": True})
+        assert plaintext.status_code == 200 and encrypted.status_code == 200
+        assert sorted(map(str, encrypted.json()["results"])) == sorted(map(str, plaintext.json()["results"]))
+
+def test_encrypted_knn_rejects_malformed_input():
+    headers = get_query_headers("knn_query")
+    bad_payloads = [
+        {"latitude": "a", "longitude": 0},
+        {"latitude": 0},
+        {"latitude": True, "longitude": 0},
+        {"latitude": 0, "longitude": 0, "k": "3"},
+        {"latitude": 0, "longitude": 0, "k": 2.5},
+        {"latitude": 0, "longitude": 0, "k": 0},
+        {"latitude": 0, "longitude": 0, "k": True}
+    ]
+    for payload in bad_payloads:
+        response = requests.post(f"{BASE_URL_SERVER_1}/knn_query", headers=headers, json={**payload, "encrypted": True})
+        assert response.status_code == 400, payload
+
+# Test Liveness / Readiness Probes during Warm-up
+def test_ready_returns_503_until_warmup_finishes():
+    app = Flask(__name__)
+    warmup = WarmUp("test")
+    register_probes(app, warmup)
+    release = threading.Event()
+
+    @app.route('/data', methods=['GET'])
+    def data():
+        return jsonify({"status": "ok"}), 200
+
+    @warmup.phase("slow_phase")
+    def slow_phase():
+        warmup.report_progress(1, 2)
+        release.wait(timeout=10)
+
+    warmup.start()
+    client = app.test_client()
+
+    assert client.get('/health').status_code == 200
+    response = client.get('/ready')
+    assert response.status_code == 503
+    assert response.get_json()["progress"] == {"done": 1, "total": 2}
+    assert client.get('/data').status_code == 503
+
+    release.set()
+    warmup._thread.join(timeout=10)
+    assert client.get('/ready').status_code == 200
+    assert client.get('/data').status_code == 200
+
+def test_ready_waits_for_slow_redis_instead_of_failing(monkeypatch):
+    attempts = []
+
+    class SlowStartingRedis:
+        def __init__(self, **kwargs):
+            attempts.append(kwargs)
+
+        def ping(self):
+            if len(attempts) <= token_manager.REDIS_CONNECT_RETRIES + 1:  # Down for a whole retry round and then some
+                raise redis.ConnectionError("connection refused")
+
+    monkeypatch.setattr(token_manager.redis, "StrictRedis", SlowStartingRedis)
+    monkeypatch.setattr(token_manager, "_redis_client", None)
+    monkeypatch.setattr(token_manager, "REDIS_BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(token_manager, "REDIS_BACKOFF_MAX", 0.2)
+
+    app = Flask(__name__)
+    warmup = WarmUp("test")
+    register_probes(app, warmup)
+    retried = threading.Event()
+
+    @warmup.phase("connect_redis")
+    def connect_redis():
+        token_manager.wait_for_redis(on_retry=lambda rounds: (warmup.report_progress(rounds, None), retried.set()))
+
+    warmup.start()
+    client = app.test_client()
+
+    assert retried.wait(timeout=10)
+    assert client.get('/health').status_code == 200
+    assert client.get('/ready').status_code == 503
+    warmup._thread.join(timeout=10)
+    assert client.get('/ready').status_code == 200
+    assert client.get('/health').status_code == 200
+    assert len(attempts) == token_manager.REDIS_CONNECT_RETRIES + 2
+
+def test_server_1_health_and_ready():
+    assert requests.get(f"{BASE_URL_SERVER_1}/health").status_code == 200
+    deadline = time.time() + 120
+    while requests.get(f"{BASE_URL_SERVER_1}/ready").status_code == 503 and time.time() < deadline:
+        time.sleep(1)
+    assert requests.get(f"{BASE_URL_SERVER_1}/ready").status_code == 200
+
+# Test Compound Query Planner
+def test_query_explain_runs_plaintext_filters_before_encrypted_range():
+    headers = get_query_headers("compound_query")
+    payload = {
+        "predicates": [
+            {"type": "range", "field": "billing_amount", "min_value": 10000, "max_value": 40000},
+            {"type": "exact", "field": "gender", "value": "Male"},
+            {"type": "range", "field": "age", "min_value": 20, "max_value": 80}
+        ],
+        "fields": ["name", "gender", "age"],
+        "explain": True
+    }
+    response = requests.post(f"{BASE_URL_SERVER_1}/query", headers=headers, json=payload)
+    assert response.status_code == 200
+    plan = response.json()["plan"]
+
+    assert [step["predicate"]["field"] for step in plan][-1] == "billing_amount"
+    assert plan[0]["estimated_rows"] <= plan[1]["estimated_rows"]
+    for previous, step in zip(plan, plan[1:]):
+        assert step["rows_in"] == previous["rows_out"]
+    # Only the packed ciphertexts holding rows that survived the plaintext filters are decrypted
+    survivors = [
+        (i, row) for i, row in enumerate(load_rows())
+        if row["gender"].lower() == "male" and 20 <= float(row["age"]) <= 80
+    ]
+    assert plan[-1]["rows_in"] == len(survivors)
+    assert plan[-1]["decryptions"] == len({i // PACKING_FACTOR for i, _ in survivors})
+
+    expected = {
+        row["name"] for _, row in survivors
+        if 10000 <= int(float(row["billing_amount"] or 0)) // SCALING_FACTOR * SCALING_FACTOR <= 40000
+    }
+    assert {result["name"] for result in response.json()["results"]} == expected
+
+def test_query_knn_ranks_only_filtered_rows():
+    headers = get_query_headers("compound_query")
+    payload = {
+        "predicates": [
+            {"type": "knn", "latitude": 0.0, "longitude": 0.0, "k": 3, "encrypted": True},
+            {"type": "exact", "field": "gender", "value": "Female"}
+        ],
+        "fields": ["name", "gender"],
+        "explain": True
+    }
+    response = requests.post(f"{BASE_URL_SERVER_1}/query", headers=headers, json=payload)
+    assert response.status_code == 200
+    assert [step["predicate"]["type"] for step in response.json()["plan"]] == ["exact", "knn"]
+    assert response.json()["plan"][-1]["estimated_rows"] == 3
+    assert len(response.json()["results"]) <= 3
+    assert all(result["gender"] == "Female" for result in response.json()["results"])
+
+def test_query_rejects_malformed_input():
+    headers = get_query_headers("compound_query")
+    bad_payloads = [
+        {"predicates": ["x"]},
+        {"predicates": [{"type": "exact", "field": ["a"], "value": "x"}]},
+        {"predicates": [{"type": "exact", "field": "name", "value": "x"}], "fields": "name"},
+        {"predicates": [{"type": "range", "field": "age", "min_value": "1", "max_value": 5}]},
+        {"predicates": [{"type": "knn", "latitude": 0, "longitude": 0, "k": 0}]},
+        {"predicates": [{"type": "knn", "latitude": 0, "longitude": 0, "k": "5"}]},
+        {"predicates": [{"type": "range", "field": "billing_amount", "min_value": 1, "max_value": 5}], "fields": ["billing_amount"]},
+        {"predicates": [{"type": "unknown"}]},
+        {"predicates": []},
+        ["not", "an", "object"]
+    ]
+    for payload in bad_payloads:
+        response = requests.post(f"{BASE_URL_SERVER_1}/query", headers=headers, json=payload)
+        assert response.status_code == 400, payload
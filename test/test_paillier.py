@@ -0,0 +1,88 @@
+import os
+import sys
+import pytest
+
+# Add backend to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+from shared import paillier
+from shared.paillier import (
+    PACKING_FACTOR, PACKING_SLOT_BITS, PACKING_VALUE_BITS, get_keypair,
+    pack_values, unpack_values, packed_addition
+)
+
+MAX_VALUE = (1 << PACKING_VALUE_BITS) - 1
+
+# Test Pack / Unpack Round Trip
+def test_pack_unpack_round_trip():
+    values = [0, 1, MAX_VALUE] + list(range(PACKING_FACTOR - 3))
+    assert unpack_values(pack_values(values), len(values)) == values
+
+def test_packed_plaintext_fits_below_phe_max_int():
+    public_key, _ = get_keypair()
+    assert pack_values([MAX_VALUE] * PACKING_FACTOR) << (PACKING_SLOT_BITS - PACKING_VALUE_BITS) < public_key.max_int
+
+# Test Packing Bounds
+def test_pack_rejects_too_many_values():
+    with pytest.raises(ValueError):
+        pack_values([1] * (PACKING_FACTOR + 1))
+
+@pytest.mark.parametrize("value", [-1, MAX_VALUE + 1])
+def test_pack_rejects_values_outside_slot(value):
+    with pytest.raises(ValueError):
+        pack_values([value])
+
+# Test Packed Addition
+def test_packed_addition_sums_slot_wise_without_carry():
+    public_key, private_key = get_keypair()
+    first, second = [MAX_VALUE] * PACKING_FACTOR, list(range(PACKING_FACTOR))
+    encrypted_sum = packed_addition(
+        public_key.encrypt(pack_values(first)),
+        public_key.encrypt(pack_values(second)),
+        public_key.encrypt(pack_values(first))
+    )
+    expected = [2 * a + b for a, b in zip(first, second)]
+    assert unpack_values(private_key.decrypt(encrypted_sum)) == expected
+
+def test_packed_addition_rejects_more_terms_than_headroom(monkeypatch):
+    monkeypatch.setattr(paillier, "PACKING_VALUE_BITS", PACKING_SLOT_BITS - 2)  # Headroom for 4 additions
+    public_key, _ = get_keypair()
+    encrypted = public_key.encrypt(pack_values([1]))
+    packed_addition(*[encrypted] * 4)
+    with pytest.raises(ValueError):
+        packed_addition(*[encrypted] * 5)
+
+def test_packed_addition_requires_input():
+    with pytest.raises(ValueError):
+        packed_addition()
+
+# Test Encrypted Squared Distance
+@pytest.mark.parametrize("point, query", [
+    ((10.5, -20.25), (0.0, 0.0)),
+    ((-18.4114, -64.3914), (11.1150, -173.5162)),
+    ((45.0, 90.0), (45.0, 90.0))
+])
+def test_encrypted_squared_distance_matches_plaintext(point, query):
+    _, private_key = get_keypair()
+    encrypted_point = paillier.encrypt_coordinates(*point)
+    x, y = (paillier.encode_coordinate(value) for value in point)
+    qx, qy = (paillier.encode_coordinate(value) for value in query)
+    distance = private_key.decrypt(paillier.encrypted_squared_distance(encrypted_point, *query))
+    assert distance == (x - qx) ** 2 + (y - qy) ** 2
+
+# Test Shared Keypair File
+def test_saved_keypair_decrypts_ciphertexts_from_original(tmp_path):
+    public_key, private_key = get_keypair()
+    path = str(tmp_path / "paillier_key.json")
+    paillier.save_keypair(public_key, private_key, path)
+
+    loaded_public_key, loaded_private_key = paillier.load_keypair(path)
+    assert loaded_public_key == public_key
+    assert loaded_private_key.decrypt(public_key.encrypt(12345)) == 12345
+
+def test_save_keypair_never_overwrites(tmp_path):
+    public_key, private_key = get_keypair()
+    path = str(tmp_path / "paillier_key.json")
+    paillier.save_keypair(public_key, private_key, path)
+    with pytest.raises(FileExistsError):
+        paillier.save_keypair(public_key, private_key, path)
+    assert list(tmp_path.iterdir()) == [tmp_path / "paillier_key.json"]
@@ -0,0 +1,38 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add backend to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+from shared.shared_store import SharedArrayStore, arrays_to_dataframe, dataframe_to_arrays
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        "name": ["Bobby Jackson", "Leslie Terry", None],
+        "age": [30, 62, 45],
+        "latitude": [-18.41, 11.11, np.nan]
+    })
+
+# Test Shared-Memory Dataset
+def test_dataframe_round_trip_shares_memory(frame):
+    arrays, categories = dataframe_to_arrays(frame)
+    store = SharedArrayStore(arrays)
+    try:
+        shared = arrays_to_dataframe(store, frame.columns, categories)
+        pd.testing.assert_frame_equal(shared.astype(object), frame.astype(object))
+        assert np.shares_memory(shared["latitude"].to_numpy(), store["column:latitude"])
+        assert np.shares_memory(shared["name"].array.codes, store["column:name"])
+    finally:
+        store.close(unlink=True)
+
+def test_shared_views_are_read_only(frame):
+    arrays, _ = dataframe_to_arrays(frame)
+    store = SharedArrayStore(arrays)
+    try:
+        with pytest.raises(ValueError):
+            store["column:age"][0] = 1
+    finally:
+        store.close(unlink=True)
@@ -0,0 +1,44 @@
+import math
+import os
+import random
+import sys
+import pytest
+
+# Add backend to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+from shared.spatial_grid import build_grid, grid_candidates
+
+CELL_DEGREES = 10
+
+def nearest(points, latitude, longitude, k, row_ids=None):
+    row_ids = points if row_ids is None else row_ids
+    return sorted(row_ids, key=lambda row_id: math.dist(points[row_id], (latitude, longitude)))[:k]
+
+def prefiltered_nearest(points, latitude, longitude, k, allowed=None):
+    candidates = grid_candidates(build_grid(points, CELL_DEGREES), latitude, longitude, k, CELL_DEGREES, allowed)
+    return nearest(points, latitude, longitude, k, candidates)
+
+# Test Grid Prefilter Keeps the True Nearest Neighbours
+def test_neighbour_beyond_the_first_safety_ring_is_kept():
+    points = {0: (9.9, 9.9), 1: (-10.05, 0.1)}
+    assert prefiltered_nearest(points, 0.1, 0.1, 1) == [1]
+
+@pytest.mark.parametrize("seed", range(20))
+def test_prefilter_matches_brute_force(seed):
+    rng = random.Random(seed)
+    points = {row_id: (rng.uniform(-90, 90), rng.uniform(-180, 180)) for row_id in range(200)}
+    for _ in range(10):
+        latitude, longitude, k = rng.uniform(-90, 90), rng.uniform(-180, 180), rng.randint(1, 10)
+        assert prefiltered_nearest(points, latitude, longitude, k) == nearest(points, latitude, longitude, k)
+
+def test_prefilter_respects_allowed_rows():
+    rng = random.Random(7)
+    points = {row_id: (rng.uniform(-90, 90), rng.uniform(-180, 180)) for row_id in range(200)}
+    allowed = {row_id for row_id in points if row_id % 3 == 0}
+    assert prefiltered_nearest(points, 12.5, 40.0, 5, allowed) == nearest(points, 12.5, 40.0, 5, allowed)
+
+def test_prefilter_skips_far_cells_when_k_is_small():
+    points = {row_id: (lat + 0.5, lon + 0.5) for row_id, (lat, lon) in enumerate(
+        (lat, lon) for lat in range(-80, 80, 10) for lon in range(-170, 170, 10))}
+    candidates = grid_candidates(build_grid(points, CELL_DEGREES), 5.0, 5.0, 1, CELL_DEGREES)
+    assert len(candidates) < len(points) / 10
@@ -0,0 +1,46 @@
+import os
+import sys
+import time
+import pytest
+import redis
+
+# Add backend to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+from shared import token_manager
+
+class UnreachableRedis:
+    attempts = 0
+
+    def __init__(self, **kwargs):
+        assert kwargs["socket_connect_timeout"] == token_manager.REDIS_CONNECT_TIMEOUT
+        UnreachableRedis.attempts += 1
+
+    def ping(self):
+        raise redis.ConnectionError("connection refused")
+
+@pytest.fixture
+def unreachable_redis(monkeypatch):
+    UnreachableRedis.attempts = 0
+    monkeypatch.setattr(token_manager.redis, "StrictRedis", UnreachableRedis)
+    monkeypatch.setattr(token_manager, "_redis_client", None)
+    monkeypatch.setattr(token_manager, "_redis_retry_at", 0.0)
+    return UnreachableRedis
+
+# Test Lazy Redis Connection on the Request Path
+def test_request_path_skips_reconnect_during_cooldown(unreachable_redis):
+    manager = token_manager.TokenManager()
+    assert manager.validate_access_token("token") is False
+    assert manager.validate_access_token("token") is False
+    assert unreachable_redis.attempts == 1
+
+def test_request_path_does_not_wait_for_another_connecting_thread(unreachable_redis):
+    with token_manager._redis_lock:
+        start = time.monotonic()
+        assert token_manager.get_redis_client(retries=1, blocking=False) is None
+        assert time.monotonic() - start < 0.1
+    assert unreachable_redis.attempts == 0
+
+def test_blocking_connect_retries_with_backoff(unreachable_redis, monkeypatch):
+    monkeypatch.setattr(token_manager, "REDIS_BACKOFF_BASE", 0.01)
+    assert token_manager.get_redis_client(retries=3) is None
+    assert unreachable_redis.attempts == 3